@@ -1,10 +1,9 @@
 import streamlit as st
-import pandas as pd
-import numpy as np
 import matplotlib.pyplot as plt
 import seaborn as sns
-import random
 import io
+
+from simulation_exp3 import PublicGoodsGame
 import platform
 import matplotlib.font_manager as fm
 
@@ -35,93 +34,42 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# --- 核心仿真逻辑 (复用之前的类，稍作适配) ---
-class PublicGoodsGame:
-    def __init__(self, n_players=10, endowment=10, multiplier=2.0, rounds=10):
-        self.n_players = n_players
-        self.endowment = endowment
-        self.multiplier = multiplier
-        self.rounds = rounds
-        self.history = []
-        # 定义玩家类型
-        self.player_types = ['free_rider'] * int(n_players * 0.2) + \
-                            ['altruist'] * int(n_players * 0.2) + \
-                            ['conditional'] * (n_players - int(n_players * 0.2) - int(n_players * 0.2))
+# --- 核心仿真逻辑 (与数据生成脚本共用 simulation_exp3 模块) ---
+# 治理模式的显示名称
+MODE_LABELS = {'none': '无治理模式', 'punishment': '惩罚机制', 'reward': '奖励机制'}
 
-    def calculate_payoff(self, contribution, total_pool, governance_type='none', contributions_list=None):
-        share_from_pool = (total_pool * self.multiplier) / self.n_players
-        base_payoff = (self.endowment - contribution) + share_from_pool
-        final_payoff = base_payoff
-        avg_contribution = np.mean(contributions_list) if contributions_list is not None else 0
-        
-        if governance_type == 'punishment':
-            if contribution < avg_contribution * 0.8:
-                final_payoff = 0 
-        elif governance_type == 'reward':
-            if contribution > avg_contribution:
-                final_payoff += 5 
-        
-        return max(0, round(final_payoff, 2))
+# --- 仿真结果缓存 (参数与种子相同时，重复点击直接返回结果) ---
+@st.cache_data
+def run_sim(n_players, endowment, multiplier, rounds, governance_types, seed):
+    game = PublicGoodsGame(n_players, endowment, multiplier, n_rounds=rounds, seed=seed)
+    return game.run_simulations(governance_types)
 
-    def get_decision(self, player_idx, current_round, prev_avg_contribution):
-        p_type = self.player_types[player_idx]
-        noise = np.random.randint(-1, 2)
-        
-        if current_round == 1:
-            if p_type == 'free_rider': return np.random.randint(0, 3)
-            if p_type == 'altruist': return np.random.randint(int(self.endowment*0.8), self.endowment+1)
-            return np.random.randint(int(self.endowment*0.4), int(self.endowment*0.7))
-            
-        if p_type == 'free_rider':
-            return max(0, min(self.endowment, 0 + max(0, noise)))
-        elif p_type == 'altruist':
-            return max(0, min(self.endowment, self.endowment + min(0, noise)))
-        elif p_type == 'conditional':
-            decision = int(prev_avg_contribution) + noise
-            return max(0, min(self.endowment, decision))
-            
-    def run_simulation(self, governance_type='none'):
-        self.history = []
-        prev_avg = 0
-        
-        # 为了演示效果，每次运行重置随机种子不太好，这里让它随机
-        # 但为了教学复现，可以在外部控制
-        
-        for r in range(1, self.rounds + 1):
-            contributions = []
-            # 1. 决策阶段
-            for i in range(self.n_players):
-                base_c = self.get_decision(i, r, prev_avg)
-                
-                # 策略适应
-                if governance_type == 'punishment' and self.player_types[i] == 'free_rider':
-                    # 尝试避免惩罚，但不一定成功
-                    base_c = max(base_c, int(prev_avg * 0.8) if prev_avg > 0 else 0)
-                
-                if governance_type == 'reward' and self.player_types[i] == 'conditional':
-                    base_c += 1
-                    
-                c = max(0, min(self.endowment, base_c))
-                contributions.append(c)
-            
-            total_pool = sum(contributions)
-            current_avg = total_pool / self.n_players
-            prev_avg = current_avg
-            
-            # 2. 结算阶段
-            for i in range(self.n_players):
-                c = contributions[i]
-                reward = self.calculate_payoff(c, total_pool, governance_type, contributions)
-                self.history.append({
-                    'round': r,
-                    'player_id': i + 1,
-                    'player_type': self.player_types[i], # 增加类型记录便于教学
-                    'contribution': c,
-                    'total_pool': total_pool,
-                    'reward': reward,
-                    'governance': governance_type
-                })
-        return pd.DataFrame(self.history)
+# --- 图表与聚合缓存 (数据不变时，页面交互重跑无需重新计算/绘图) ---
+@st.cache_data
+def contribution_trends(df_all):
+    # 预先聚合每种模式每轮的平均贡献，绘图时无需在长表上重新聚合/自助法估计置信区间
+    return df_all.groupby(['governance', 'round'], observed=True, as_index=False)['contribution'].mean()
+
+@st.cache_data
+def trend_fig(trends):
+    fig, ax = plt.subplots(figsize=(10, 5))
+    sns.lineplot(data=trends, x='round', y='contribution', hue='governance', style='governance', markers=True, errorbar=None, ax=ax, linewidth=2.5)
+    ax.set_title("Average Contribution by Governance Type", fontsize=14)
+    ax.set_ylim(0, 11)
+    ax.grid(True, linestyle='--', alpha=0.7)
+    return fig
+
+@st.cache_data
+def payoff_summary_by_type(df_all):
+    # 计算每种模式下，每种玩家类型的平均收益
+    return df_all.groupby(['governance', 'player_type'], observed=True)['reward'].mean().reset_index()
+
+@st.cache_data
+def payoff_fig(payoff_summary):
+    fig, ax = plt.subplots(figsize=(10, 5))
+    sns.barplot(data=payoff_summary, x='governance', y='reward', hue='player_type', palette="viridis", ax=ax)
+    ax.set_title("Average Reward: Player Type vs Governance", fontsize=14)
+    return fig
 
 # --- 侧边栏导航 ---
 st.sidebar.title("📚 实验导航")
@@ -179,9 +127,12 @@ elif page == "💻 仿真实验控制台":
     with col1:
         st.subheader("⚙️ 参数设置")
         n_players = st.number_input("玩家数量 (N)", min_value=5, max_value=50, value=10)
-        endowment = st.number_input("初始禀赋 (E)", value=10)
+        # 贡献量以 int8 存储，禀赋上限需在其范围内
+        endowment = st.number_input("初始禀赋 (E)", min_value=1, max_value=100, value=10)
         multiplier = st.slider("增值系数 (M)", 1.0, 5.0, 2.0, step=0.1)
         rounds = st.slider("博弈轮次", 5, 50, 20)
+        seed = st.number_input("随机种子 (Seed)", min_value=0, value=42, step=1,
+                               help="相同参数与种子可复现同一组仿真数据")
         
         st.markdown("---")
         st.markdown("**治理模式选择**")
@@ -195,59 +146,48 @@ elif page == "💻 仿真实验控制台":
         st.subheader("🖥️ 运行日志与代码预览")
         
         # 展示核心代码逻辑供学生学习
-        with st.expander("查看 Python 核心类代码 (PublicGoodsGame)"):
+        with st.expander("查看 Python 核心仿真代码 (_simulate_all_rounds)"):
             st.code("""
-class PublicGoodsGame:
-    def calculate_payoff(self, contribution, total_pool, gov_type, ...):
-        # ... (省略部分代码)
-        if gov_type == 'punishment':
-            if contribution < avg * 0.8:
-                final_payoff = 0  # 收益归零
-        elif gov_type == 'reward':
-            if contribution > avg:
-                final_payoff += 5 # 额外奖励
+@njit(cache=True)
+def _simulate_all_rounds(types, R, N, E, M, gov_codes, rng):
+    # ... (省略决策阶段代码)
+    avg = total_pool / N
+    if gov_code == PUNISHMENT:
+        # 收益归零
+        final_payoff = np.where(contributions < avg * 0.8, 0.0, final_payoff)
+    elif gov_code == REWARD:
+        # 额外奖励
+        final_payoff = np.where(contributions > avg, final_payoff + 5, final_payoff)
             """, language="python")
 
         if btn_run:
-            game = PublicGoodsGame(n_players, endowment, multiplier, rounds)
-            data_frames = []
+            modes = [mode for mode, selected in
+                     [('none', run_none), ('punishment', run_punish), ('reward', run_reward)]
+                     if selected]
             
             progress_bar = st.progress(0)
             status_text = st.empty()
             
-            if run_none:
-                status_text.text("正在运行：无治理模式...")
-                df_none = game.run_simulation('none')
-                data_frames.append(df_none)
-                st.session_state['df_none'] = df_none
-                progress_bar.progress(33)
-                
-            if run_punish:
-                status_text.text("正在运行：惩罚机制...")
-                df_punish = game.run_simulation('punishment')
-                data_frames.append(df_punish)
-                st.session_state['df_punish'] = df_punish
-                progress_bar.progress(66)
-                
-            if run_reward:
-                status_text.text("正在运行：奖励机制...")
-                df_reward = game.run_simulation('reward')
-                data_frames.append(df_reward)
-                st.session_state['df_reward'] = df_reward
-                progress_bar.progress(100)
+            # 选中的治理模式在同一次仿真中完成，直接得到合并后的数据
+            if modes:
+                status_text.text("正在运行：" + "、".join(MODE_LABELS[m] for m in modes) + "...")
+                df_all = run_sim(n_players, endowment, multiplier, rounds, tuple(modes), seed)
+            progress_bar.progress(100)
                 
             status_text.text("✅ 仿真完成！请前往“数据分析与可视化”模块查看结果。")
             
-            # 合并数据并保存到 session state
-            if data_frames:
-                df_all = pd.concat(data_frames)
+            # 保存到 session state
+            if modes:
                 st.session_state['df_all'] = df_all
                 
                 st.success(f"成功生成 {len(df_all)} 条仿真数据！")
                 st.dataframe(df_all.head(10))
                 
                 # 下载按钮
-                csv = df_all.to_csv(index=False).encode('utf-8')
+                # 直接写入字节缓冲区，避免先生成 str 再 encode 的二次拷贝
+                buf = io.BytesIO()
+                df_all.to_csv(buf, index=False, encoding='utf-8')
+                csv = buf.getvalue()
                 st.download_button(
                     "📥 下载完整实验数据 (CSV)",
                     csv,
@@ -271,24 +211,13 @@ elif page == "📊 数据分析与可视化":
         st.subheader("1. 平均贡献率演变趋势")
         st.markdown("观察不同治理机制下，群体平均贡献随时间的变化。")
         
-        fig, ax = plt.subplots(figsize=(10, 5))
-        sns.lineplot(data=df_all, x='round', y='contribution', hue='governance', style='governance', markers=True, ax=ax, linewidth=2.5)
-        ax.set_title("Average Contribution by Governance Type", fontsize=14)
-        ax.set_ylim(0, 11)
-        ax.grid(True, linestyle='--', alpha=0.7)
-        st.pyplot(fig)
+        st.pyplot(trend_fig(contribution_trends(df_all)))
         
         # 2. 收益热力图/分布
         st.subheader("2. 玩家类型与收益分析")
         st.markdown("对比“搭便车者(free_rider)”与“利他者(altruist)”在不同模式下的平均收益。")
         
-        # 计算每种模式下，每种玩家类型的平均收益
-        payoff_summary = df_all.groupby(['governance', 'player_type'])['reward'].mean().reset_index()
-        
-        fig2, ax2 = plt.subplots(figsize=(10, 5))
-        sns.barplot(data=payoff_summary, x='governance', y='reward', hue='player_type', palette="viridis", ax=ax2)
-        ax2.set_title("Average Reward: Player Type vs Governance", fontsize=14)
-        st.pyplot(fig2)
+        st.pyplot(payoff_fig(payoff_summary_by_type(df_all)))
         
         st.markdown("""
         **观察要点**：
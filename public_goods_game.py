@@ -6,10 +6,37 @@
 """
 
 import random
-import csv
 import os
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, field
-from typing import List, Dict, Tuple
+from typing import List, Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+# 策略类型编码（用于向量化决策）
+COOPERATOR, FREE_RIDER, CONDITIONAL = 0, 1, 2
+STRATEGY_CODES = {"cooperator": COOPERATOR, "free_rider": FREE_RIDER, "conditional": CONDITIONAL}
+
+
+# 单次仿真记录表的列顺序
+RECORD_COLUMNS = ["round", "player_id", "contribution", "total_pool", "reward"]
+
+
+# 支持的导出格式 → 文件扩展名
+FILE_EXTENSIONS = {"csv": "csv", "parquet": "parquet"}
+
+
+def _write_frame(df: pd.DataFrame, filepath: str, format: str = "csv") -> None:
+    """按指定格式写出 DataFrame，必要时创建目录。"""
+    os.makedirs(os.path.dirname(filepath) or ".", exist_ok=True)
+    if format == "csv":
+        df.to_csv(filepath, index=False, encoding="utf-8")
+    elif format == "parquet":
+        df.to_parquet(filepath, engine="pyarrow", compression="snappy", index=False)
+    else:
+        raise ValueError(f"不支持的导出格式：{format!r}，可选 {list(FILE_EXTENSIONS)}")
 
 
 # ──────────────────────── 玩家类 ────────────────────────
@@ -27,24 +54,26 @@ class Player:
     endowment: int = 10
     history: List[int] = field(default_factory=list)   # 历史贡献
     rewards: List[float] = field(default_factory=list)  # 历史收益
+    rand: Optional[random.Random] = field(default=None, repr=False, compare=False)  # 随机源，None 时回退到全局 random
 
     def decide_contribution(self, round_num: int, prev_avg: float = 5.0) -> int:
         """
         根据策略类型决定本轮贡献值。
         增加了一定随机噪声以体现个体差异。
         """
+        rand = self.rand or random
         if self.strategy == "cooperator":
-            base = random.randint(6, 10)
+            base = rand.randint(6, 10)
         elif self.strategy == "free_rider":
-            base = random.randint(0, 3)
+            base = rand.randint(0, 3)
         else:  # conditional
             # 跟随上一轮平均值并加微调
-            base = max(0, min(10, int(prev_avg) + random.randint(-2, 2)))
+            base = max(0, min(10, int(prev_avg) + rand.randint(-2, 2)))
 
         # 随轮次增加，行为可能漂移
         if round_num > 10 and self.strategy == "conditional":
             # 后期条件合作者可能降低贡献（疲劳效应）
-            base = max(0, base - random.randint(0, 2))
+            base = max(0, base - rand.randint(0, 2))
 
         return max(0, min(self.endowment, base))
 
@@ -60,7 +89,8 @@ class PublicGoodsGame:
     endowment : int   每轮初始禀赋，默认 10
     multiplier : float 公共池增值系数，默认 2.0
     n_rounds : int    博弈轮次，默认 15
-    seed : int        随机种子（可选）
+    seed : int        随机种子（可选），用于实例自身的 np.random.Generator 与 random.Random，不影响全局随机状态
+    track_per_player : bool  是否记录每位玩家的历史贡献与收益（Player.history / rewards），默认 False
     """
 
     def __init__(
@@ -70,13 +100,16 @@ class PublicGoodsGame:
         multiplier: float = 2.0,
         n_rounds: int = 15,
         seed: int = None,
+        track_per_player: bool = False,
     ):
         self.n_players = n_players
         self.endowment = endowment
         self.multiplier = multiplier
         self.n_rounds = n_rounds
-        if seed is not None:
-            random.seed(seed)
+        self.track_per_player = track_per_player
+        self.rng = np.random.default_rng(seed)
+        # 仅供单独调用 Player.decide_contribution 时使用；仿真本身只用 self.rng（见 _decide_contributions）
+        self._rand = random.Random(seed)
 
         # 分配策略：3 合作者、3 搭便车、4 条件合作
         strategies = (
@@ -84,12 +117,15 @@ class PublicGoodsGame:
             + ["free_rider"] * 3
             + ["conditional"] * 4
         )
-        random.shuffle(strategies)
+        self.rng.shuffle(strategies)
 
         self.players: List[Player] = [
-            Player(player_id=i + 1, strategy=strategies[i], endowment=endowment)
+            Player(player_id=i + 1, strategy=strategies[i], endowment=endowment, rand=self._rand)
             for i in range(n_players)
         ]
+        self.strategy_codes = np.array(
+            [STRATEGY_CODES[p.strategy] for p in self.players], dtype=np.int8
+        )
 
     # ───────────── 收益计算核心 ─────────────
     @staticmethod
@@ -98,30 +134,70 @@ class PublicGoodsGame:
         """基础收益公式：π_i = (E - c_i) + (Σc_j × M) / N"""
         return (endowment - contribution) + (total_pool * multiplier) / n_players
 
+    # ───────────── 向量化决策 ─────────────
+    def _draw_noise(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        一次性抽取全部轮次的决策噪声，均为 (n_rounds, n_players) 矩阵：
+          fixed      合作者 / 搭便车者的贡献（与 prev_avg 无关，可提前确定）
+          cond_noise 条件合作者在上一轮均值上的微调
+          fatigue    条件合作者后期（round > 10）的疲劳降幅
+        """
+        shape = (self.n_rounds, self.n_players)
+        cooperator = self.rng.integers(6, 11, size=shape)
+        free_rider = self.rng.integers(0, 4, size=shape)
+        fixed = np.minimum(np.where(self.strategy_codes == COOPERATOR, cooperator, free_rider),
+                           self.endowment)
+        cond_noise = self.rng.integers(-2, 3, size=shape)
+        fatigue = self.rng.integers(0, 3, size=shape)
+        return fixed, cond_noise, fatigue
+
+    def _decide_contributions(self, round_num: int, prev_avg: float,
+                              noise: Tuple[np.ndarray, np.ndarray, np.ndarray]) -> np.ndarray:
+        """
+        一次性决定全体玩家的本轮贡献值，逻辑与 Player.decide_contribution 一致。
+        noise 为 _draw_noise() 的结果，按轮次取行，本方法不再调用 rng。
+        """
+        fixed, cond_noise, fatigue = noise
+        i = round_num - 1
+
+        # 条件合作者：跟随上一轮平均值并加微调
+        # （小数组上 np.minimum/np.maximum 比 np.clip 开销小得多）
+        conditional = np.minimum(np.maximum(int(prev_avg) + cond_noise[i], 0), 10)
+        # 后期条件合作者可能降低贡献（疲劳效应）
+        if round_num > 10:
+            conditional = np.maximum(0, conditional - fatigue[i])
+        conditional = np.minimum(conditional, self.endowment)
+
+        return np.where(self.strategy_codes == CONDITIONAL, conditional, fixed[i])
+
     # ───────────── 单轮模拟 ─────────────
     def _simulate_round(
-        self, round_num: int, governance: str, prev_avg: float
-    ) -> List[Dict]:
+        self, round_num: int, governance: str, prev_avg: float,
+        noise: Tuple[np.ndarray, np.ndarray, np.ndarray],
+    ) -> Tuple[np.ndarray, int, List[float]]:
         """
         模拟一轮博弈。
 
         governance: "none" | "punishment" | "reward"
         prev_avg  : 上一轮平均贡献值（用于条件合作者决策）
+        noise     : _draw_noise() 预先抽取的全部轮次噪声
+
+        返回 (贡献数组, 公共池总额, 收益列表)，与 self.players 按位置对应。
         """
         # 1) 每位玩家做出贡献决策
-        contributions = {}
-        for p in self.players:
-            c = p.decide_contribution(round_num, prev_avg)
-            contributions[p.player_id] = c
-            p.history.append(c)
-
-        total_pool = sum(contributions.values())
+        # contribs[i] 与 self.players[i] 按位置对应
+        contribs = self._decide_contributions(round_num, prev_avg, noise)
+        contrib_list = contribs.tolist()
+        if self.track_per_player:
+            for p, c in zip(self.players, contrib_list):
+                p.history.append(c)
+
+        total_pool = int(contribs.sum())
         avg_contribution = total_pool / self.n_players
 
         # 2) 计算每位玩家收益
-        records = []
-        for p in self.players:
-            c_i = contributions[p.player_id]
+        rewards = []
+        for p, c_i in zip(self.players, contrib_list):
             reward = self._base_reward(
                 c_i, total_pool, self.multiplier, self.n_players, self.endowment
             )
@@ -138,19 +214,23 @@ class PublicGoodsGame:
                     reward *= 1.3
 
             reward = round(reward, 2)
-            p.rewards.append(reward)
+            if self.track_per_player:
+                p.rewards.append(reward)
+            rewards.append(reward)
 
-            records.append({
-                "round": round_num,
-                "player_id": p.player_id,
-                "contribution": c_i,
-                "total_pool": total_pool,
-                "reward": reward,
-            })
-
-        return records
+        return contribs, total_pool, rewards
 
     # ───────────── 运行完整仿真 ─────────────
+    def _iter_rounds(self, governance: str):
+        """逐轮运行仿真，依次产出 (轮次, 贡献数组, 公共池总额, 收益列表)。"""
+        noise = self._draw_noise()  # 全部轮次的噪声一次抽取，逐轮按行取用
+        prev_avg = self.endowment / 2  # 初始假定平均贡献为禀赋一半
+        for r in range(1, self.n_rounds + 1):
+            contribs, total_pool, rewards = self._simulate_round(r, governance, prev_avg, noise)
+            yield r, contribs, total_pool, rewards
+            # 更新上轮平均贡献
+            prev_avg = total_pool / self.n_players
+
     def run(self, governance: str = "none") -> List[Dict]:
         """
         运行 n_rounds 轮仿真。
@@ -162,30 +242,65 @@ class PublicGoodsGame:
 
         返回
         ----
-        所有轮次的记录列表
+        所有轮次的记录列表（大规模运行或导出请用 run_frame）
         """
         all_records: List[Dict] = []
-        prev_avg = self.endowment / 2  # 初始假定平均贡献为禀赋一半
+        for r, contribs, total_pool, rewards in self._iter_rounds(governance):
+            all_records.extend(
+                {
+                    "round": r,
+                    "player_id": p.player_id,
+                    "contribution": c_i,
+                    "total_pool": total_pool,
+                    "reward": reward,
+                }
+                for p, c_i, reward in zip(self.players, contribs.tolist(), rewards)
+            )
+        return all_records
 
-        for r in range(1, self.n_rounds + 1):
-            round_records = self._simulate_round(r, governance, prev_avg)
-            all_records.extend(round_records)
-            # 更新上轮平均贡献
-            prev_avg = sum(rec["contribution"] for rec in round_records) / self.n_players
+    def run_frame(self, governance: str = "none") -> pd.DataFrame:
+        """
+        运行 n_rounds 轮仿真，直接返回记录表（每行一名玩家一轮，列为 RECORD_COLUMNS）。
 
-        return all_records
+        各列预分配为窄类型数组，逐轮按切片写入，最后一次性构建 DataFrame，
+        不逐条生成记录字典。
+        """
+        n, R = self.n_players, self.n_rounds
+        round_col = np.repeat(np.arange(1, R + 1, dtype=np.int16), n)
+        player_col = np.tile(np.array([p.player_id for p in self.players], dtype=np.int16), R)
+        contrib_col = np.empty(R * n, dtype=np.int8)
+        pool_col = np.empty(R * n, dtype=np.int32)
+        reward_col = np.empty(R * n, dtype=np.float32)
+
+        for r, contribs, total_pool, rewards in self._iter_rounds(governance):
+            idx = slice((r - 1) * n, r * n)
+            contrib_col[idx] = contribs
+            pool_col[idx] = total_pool
+            reward_col[idx] = rewards
+
+        return pd.DataFrame({
+            "round": round_col,
+            "player_id": player_col,
+            "contribution": contrib_col,
+            "total_pool": pool_col,
+            "reward": reward_col,
+        })
+
+    # ───────────── 导出文件 ─────────────
+    @staticmethod
+    def to_file(records, filepath: str, format: str = "csv") -> None:
+        """
+        将记录导出为文件。records 可以是 run_frame() 返回的记录表，或 run() 返回的记录列表。
+
+        format : str
+            "csv"（默认，便于交换与下载）| "parquet"（列式存储，写入更快、体积更小，需安装 pyarrow）
+        """
+        _write_frame(pd.DataFrame(records, columns=RECORD_COLUMNS), filepath, format)
 
-    # ───────────── 导出 CSV ─────────────
     @staticmethod
-    def to_csv(records: List[Dict], filepath: str) -> None:
-        """将记录列表导出为 CSV 文件。"""
-        os.makedirs(os.path.dirname(filepath) or ".", exist_ok=True)
-        fieldnames = ["round", "player_id", "contribution", "total_pool", "reward"]
-        with open(filepath, "w", newline="", encoding="utf-8") as f:
-            writer = csv.DictWriter(f, fieldnames=fieldnames)
-            writer.writeheader()
-            for rec in records:
-                writer.writerow({k: rec[k] for k in fieldnames})
+    def to_csv(records, filepath: str) -> None:
+        """将记录导出为 CSV 文件，等价于 to_file(records, filepath, "csv")。"""
+        PublicGoodsGame.to_file(records, filepath, format="csv")
 
     # ───────────── 重置玩家状态 ─────────────
     def reset(self) -> None:
@@ -196,41 +311,74 @@ class PublicGoodsGame:
 
 
 # ──────────────────── 便捷运行函数 ────────────────────
-def run_all_modes(seed: int = 42, n_rounds: int = 15, output_dir: str = "output"):
+def _one_mode(mode: str, seed: int, n_rounds: int, as_frame: bool = False):
+    """以独立实例运行单一治理模式（各实例自带 np.random.Generator，可并行执行）。"""
+    game = PublicGoodsGame(seed=seed, n_rounds=n_rounds)
+    return game.run_frame(governance=mode) if as_frame else game.run(governance=mode)
+
+
+def _run_modes(seed: int, n_rounds: int, output_dir: str, write_per_mode: bool,
+               format: str, as_frame: bool) -> dict:
+    """run_all_modes / run_all_modes_frames 的共同实现：并行运行三种模式并导出文件。"""
+    if format not in FILE_EXTENSIONS:
+        raise ValueError(f"不支持的导出格式：{format!r}，可选 {list(FILE_EXTENSIONS)}")
+    ext = FILE_EXTENSIONS[format]
+    modes = ["none", "punishment", "reward"]
+    # 每个模式使用独立的 PublicGoodsGame 及其 self.rng，互不干扰，可放入线程池并行
+    with ThreadPoolExecutor(max_workers=len(modes)) as pool:
+        runs = pool.map(lambda mode: _one_mode(mode, seed, n_rounds, as_frame), modes)
+        results = dict(zip(modes, runs))
+
+    for mode, records in results.items():
+        if write_per_mode:
+            file_path = os.path.join(output_dir, f"data_exp3_{mode if mode != 'none' else 'no_governance'}.{ext}")
+            PublicGoodsGame.to_file(records, file_path, format=format)
+            print(f"[✓] 模式 '{mode}' 仿真完成 → {file_path}")
+        else:
+            print(f"[✓] 模式 '{mode}' 仿真完成")
+
+    # 合并汇总文件（带 governance_mode 列）
+    summary = pd.concat(
+        [pd.DataFrame(records, columns=RECORD_COLUMNS).assign(governance_mode=mode)
+         for mode, records in results.items()],
+        ignore_index=True,
+    )[["governance_mode"] + RECORD_COLUMNS]
+
+    summary_path = os.path.join(output_dir, f"data_exp3_public_goods.{ext}")
+    _write_frame(summary, summary_path, format)
+
+    print(f"[✓] 汇总数据 → {summary_path}")
+    return results
+
+
+def run_all_modes(seed: int = 42, n_rounds: int = 15, output_dir: str = "output",
+                  write_per_mode: bool = False, format: str = "csv"):
     """
-    依次运行三种治理模式并导出 CSV。
+    并行运行三种治理模式并导出汇总文件。
+
+    参数
+    ----
+    write_per_mode : bool
+        是否额外导出每种模式各自的文件（内容已包含在汇总文件中），默认 False
+    format : str
+        导出格式 → "csv" | "parquet"，默认 "csv"
 
     返回
     ----
     results : dict[str, List[Dict]]
         键为模式名称，值为记录列表。
     """
-    modes = ["none", "punishment", "reward"]
-    results = {}
-
-    for mode in modes:
-        game = PublicGoodsGame(seed=seed, n_rounds=n_rounds)
-        records = game.run(governance=mode)
-        csv_path = os.path.join(output_dir, f"data_exp3_{mode if mode != 'none' else 'no_governance'}.csv")
-        PublicGoodsGame.to_csv(records, csv_path)
-        results[mode] = records
-        print(f"[✓] 模式 '{mode}' 仿真完成 → {csv_path}")
-
-    # 合并汇总 CSV（带 governance_mode 列）
-    all_records = []
-    for mode, recs in results.items():
-        for rec in recs:
-            row = dict(rec)
-            row["governance_mode"] = mode
-            all_records.append(row)
-
-    summary_path = os.path.join(output_dir, "data_exp3_public_goods.csv")
-    fieldnames = ["governance_mode", "round", "player_id", "contribution", "total_pool", "reward"]
-    with open(summary_path, "w", newline="", encoding="utf-8") as f:
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
-        writer.writeheader()
-        for row in all_records:
-            writer.writerow({k: row[k] for k in fieldnames})
+    return _run_modes(seed, n_rounds, output_dir, write_per_mode, format, as_frame=False)
 
-    print(f"[✓] 汇总数据 → {summary_path}")
-    return results
+
+def run_all_modes_frames(seed: int = 42, n_rounds: int = 15, output_dir: str = "output",
+                         write_per_mode: bool = False, format: str = "csv"):
+    """
+    同 run_all_modes，但各模式通过 run_frame() 运行，不生成记录字典。
+
+    返回
+    ----
+    results : dict[str, pd.DataFrame]
+        键为模式名称，值为该模式的记录表。
+    """
+    return _run_modes(seed, n_rounds, output_dir, write_per_mode, format, as_frame=True)
@@ -1,151 +1,187 @@
+# Shared simulation module for Experiment 3 (public goods game under algorithmic governance).
+# Imported by streamlit_app.py / app.py, and run as a script to generate the data files.
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 import seaborn as sns
-import random
+from numba import njit
 
-# Set random seed for reproducibility
-np.random.seed(42)
-random.seed(42)
+# Integer codes for player types, used by the vectorized decision logic
+FREE_RIDER, ALTRUIST, CONDITIONAL = 0, 1, 2
+PLAYER_TYPES = ['free_rider', 'altruist', 'conditional']
+TYPE_CODES = {t: code for code, t in enumerate(PLAYER_TYPES)}
+
+# Integer codes for governance types, so the compiled kernel avoids string comparison
+NO_GOVERNANCE, PUNISHMENT, REWARD = 0, 1, 2
+GOVERNANCE_TYPES = ['none', 'punishment', 'reward']
+GOVERNANCE_CODES = {g: code for code, g in enumerate(GOVERNANCE_TYPES)}
+
+@njit(cache=True)
+def _simulate_all_rounds(types, R, N, E, M, gov_codes, rng):
+    # Decisions + payoffs for every round, compiled with Numba
+    # rng is a np.random.Generator; its state advances across calls
+    # All governance types in gov_codes are simulated in the same pass and share
+    # the same random draws, so differences between them come from governance only
+    # Returns (contrib[G, R, N], reward[G, R, N], pool[G, R]); contrib is int8, so E must fit in int8
+    G = len(gov_codes)
+    
+    contrib = np.empty((G, R, N), dtype=np.int8)
+    reward = np.empty((G, R, N), dtype=np.float32)
+    pool = np.empty((G, R), dtype=np.int32)
+    
+    # Draw the per-player noise for every round in one call
+    noise = rng.integers(-1, 2, size=(R, N))
+    
+    # Initial round (ranges scale with the endowment E)
+    fr_init = rng.integers(0, 3, size=N)
+    al_init = rng.integers(int(E * 0.8), E + 1, size=N)
+    # Conditional starts middle; keep high > low so small E (e.g. 1) still gives a valid range
+    cond_low = int(E * 0.4)
+    cond_init = rng.integers(cond_low, max(int(E * 0.7), cond_low + 1), size=N)
+    init_decisions = np.where(types == FREE_RIDER, fr_init,
+                              np.where(types == ALTRUIST, al_init, cond_init))
+    
+    prev_avg = np.zeros(G)
+    
+    for r in range(R):
+        for g in range(G):
+            gov_code = gov_codes[g]
+            
+            # 1. Decisions Phase
+            if r == 0:
+                decisions = init_decisions
+            else:
+                # Subsequent rounds
+                fr_dec = np.clip(np.maximum(0, noise[r]), 0, E) # Always low
+                al_dec = np.clip(E + np.minimum(0, noise[r]), 0, E) # Always high
+                # Match previous average, maybe slightly less (imperfect reciprocity)
+                cond_dec = np.clip(int(prev_avg[g]) + noise[r], 0, E)
+                decisions = np.where(types == FREE_RIDER, fr_dec,
+                                     np.where(types == ALTRUIST, al_dec, cond_dec))
+            
+            # For governance simulation, strategies might adapt
+            # But for this simple exp, we assume fixed types adapting to pool size
+            # OR we can make them adapt to governance.
+            # If punishment is on, Free Riders might be forced to contribute?
+            # Let's add a "fear" factor for punishment
+            # Applied to the whole roster with masks instead of per-player branches
+            if gov_code == PUNISHMENT:
+                # Free riders adapt to avoid punishment
+                # They try to do just enough (e.g. 60-80% of perceived average)
+                # But sometimes fail. No average has been observed before round 1.
+                floor = int(prev_avg[g] * 0.8) if prev_avg[g] > 0 else 0
+                decisions = np.where(types == FREE_RIDER, np.maximum(decisions, floor), decisions)
+            elif gov_code == REWARD:
+                # Conditional cooperators contribute more to get reward
+                decisions = np.where(types == CONDITIONAL, decisions + 1, decisions)
+            
+            decisions = np.clip(decisions, 0, E)
+            contrib[g, r] = decisions
+            total_pool = decisions.sum()
+            
+            pool[g, r] = total_pool
+            avg_contribution = total_pool / N
+            prev_avg[g] = avg_contribution
+            
+            # 2. Payoff Phase
+            # Basic Public Goods Game Payoff Formula
+            # pi = (Endowment - contribution) + (Total Pool * Multiplier) / N
+            contributions = contrib[g, r].astype(np.float64)
+            share_from_pool = (total_pool * M) / N
+            final_payoff = (E - contributions) + share_from_pool
+            
+            # Governance Mechanisms
+            if gov_code == PUNISHMENT:
+                # Mechanism: Punish if contribution is significantly below average
+                # Simulating the data point: contribution 6, reward 0. 
+                # If avg is say 8, 6 is below. Let's say if c < avg * 0.8, penalty applied.
+                # Penalty logic: confiscate all earnings (simulating strict platform ban/audit).
+                # To keep it simple and match "reward=0", we just zero it out.
+                final_payoff = np.where(contributions < avg_contribution * 0.8, 0.0, final_payoff) # Severe punishment
+                    
+            elif gov_code == REWARD:
+                # Mechanism: Reward if contribution is above average
+                # Simulating traffic boost
+                # Bonus: e.g., 20% extra yield equivalent
+                final_payoff = np.where(contributions > avg_contribution, final_payoff + 5, final_payoff)
+            
+            reward[g, r] = np.maximum(0, np.round(final_payoff, 2))
+        
+    return contrib, reward, pool
 
 class PublicGoodsGame:
-    def __init__(self, n_players=10, endowment=10, multiplier=2.0, rounds=20):
+    # Constructor and run() follow public_goods_game.PublicGoodsGame (n_players, endowment,
+    # multiplier, n_rounds, seed); there is no track_per_player, and n_rounds defaults to 20 (15 there)
+    def __init__(self, n_players=10, endowment=10, multiplier=2.0, n_rounds=20, seed=None):
+        # Contributions are stored as int8 by the kernel and in the output frame
+        if endowment > np.iinfo(np.int8).max:
+            raise ValueError(f"endowment must be at most {np.iinfo(np.int8).max}, got {endowment}")
         self.n_players = n_players
         self.endowment = endowment
         self.multiplier = multiplier
-        self.rounds = rounds
-        self.history = []
+        self.n_rounds = n_rounds
+        # Random generator (PCG64) shared with the compiled kernel
+        self.rng = np.random.default_rng(seed)
+        self.history = pd.DataFrame()
         
-        # Define player types for behavioral simulation
-        # 0-1: Free Riders (Selfish) - contribute very low
-        # 2-3: Altruists - contribute high
-        # 4-9: Conditional Cooperators - contribute based on previous average
-        self.player_types = ['free_rider'] * 2 + ['altruist'] * 2 + ['conditional'] * 6
+        # Define player types for behavioral simulation (shown for N=10)
+        # 20%, 0-1: Free Riders (Selfish) - contribute very low
+        # 20%, 2-3: Altruists - contribute high
+        # rest, 4-9: Conditional Cooperators - contribute based on previous average
+        n_free_riders = n_altruists = int(n_players * 0.2)
+        self.player_types = ['free_rider'] * n_free_riders + \
+                            ['altruist'] * n_altruists + \
+                            ['conditional'] * (n_players - n_free_riders - n_altruists)
+        self.type_codes = np.array([TYPE_CODES[t] for t in self.player_types], dtype=np.int8)
 
-    def calculate_payoff(self, contribution, total_pool, governance_type='none', contributions_list=None):
-        # Basic Public Goods Game Payoff Formula
-        # pi = (Endowment - contribution) + (Total Pool * Multiplier) / N
-        share_from_pool = (total_pool * self.multiplier) / self.n_players
-        base_payoff = (self.endowment - contribution) + share_from_pool
+    def run_simulations(self, governance_types=('none', 'punishment', 'reward')):
+        # Run several governance scenarios in one kernel pass
+        # Returns one DataFrame with all scenarios, labelled by the 'governance' column
+        R, N = self.n_rounds, self.n_players
+        G = len(governance_types)
+        gov_codes = np.array([GOVERNANCE_CODES[g] for g in governance_types], dtype=np.int8)
         
-        final_payoff = base_payoff
+        contrib, reward, pool = _simulate_all_rounds(
+            self.type_codes, R, N, self.endowment, self.multiplier, gov_codes, self.rng
+        )
         
-        avg_contribution = np.mean(contributions_list) if contributions_list is not None else 0
-        
-        # Governance Mechanisms
-        if governance_type == 'punishment':
-            # Mechanism: Punish if contribution is significantly below average
-            # Simulating the data point: contribution 6, reward 0. 
-            # If avg is say 8, 6 is below. Let's say if c < avg * 0.8, penalty applied.
-            # Penalty logic: confiscate all earnings (simulating strict platform ban/audit).
-            if contribution < avg_contribution * 0.8:
-                final_payoff = 0  # Severe punishment
-            else:
-                # Small cost of auditing spread among everyone? Or just specific penalty.
-                # To keep it simple and match "reward=0", we just zero it out.
-                pass
-                
-        elif governance_type == 'reward':
-            # Mechanism: Reward if contribution is above average
-            # Simulating traffic boost
-            if contribution > avg_contribution:
-                # Bonus: e.g., 20% extra yield equivalent
-                final_payoff += 5 
-        
-        return max(0, round(final_payoff, 2))
+        # Record Data: build the frame once from the filled columns,
+        # using narrow dtypes and categorical type/governance columns to save memory
+        self.history = pd.DataFrame({
+            'round': np.tile(np.repeat(np.arange(1, R + 1, dtype=np.int16), N), G),
+            'player_id': np.tile(np.arange(1, N + 1, dtype=np.int16), G * R), # 1-based ID
+            'player_type': pd.Categorical.from_codes(
+                np.tile(self.type_codes, G * R), categories=PLAYER_TYPES
+            ),
+            'contribution': contrib.ravel(),
+            'total_pool': np.repeat(pool.ravel(), N),
+            'reward': reward.ravel(),
+            # Extra field for analysis
+            'governance': pd.Categorical.from_codes(
+                np.repeat(gov_codes, R * N), categories=GOVERNANCE_TYPES
+            ).remove_unused_categories()
+        })
+        return self.history
 
-    def get_decision(self, player_idx, current_round, prev_avg_contribution):
-        p_type = self.player_types[player_idx]
-        noise = np.random.randint(-1, 2) # Small randomness
-        
-        if current_round == 1:
-            # Initial round
-            if p_type == 'free_rider': return np.random.randint(0, 3)
-            if p_type == 'altruist': return np.random.randint(8, 11)
-            return np.random.randint(4, 7) # Conditional starts middle
-            
-        # Subsequent rounds
-        if p_type == 'free_rider':
-            return max(0, min(self.endowment, 0 + max(0, noise))) # Always low
-        elif p_type == 'altruist':
-            return max(0, min(self.endowment, 10 + min(0, noise))) # Always high
-        elif p_type == 'conditional':
-            # Match previous average, maybe slightly less (imperfect reciprocity)
-            decision = int(prev_avg_contribution) + noise
-            return max(0, min(self.endowment, decision))
-            
     def run_simulation(self, governance_type='none'):
-        self.history = []
-        prev_avg = 0
-        
-        # Re-initialize for fresh run
-        current_contributions = []
-        
-        for r in range(1, self.rounds + 1):
-            round_data = []
-            contributions = []
-            
-            # 1. Decisions Phase
-            for i in range(self.n_players):
-                # For governance simulation, strategies might adapt
-                # But for this simple exp, we assume fixed types adapting to pool size
-                # OR we can make them adapt to governance.
-                # If punishment is on, Free Riders might be forced to contribute?
-                # Let's add a "fear" factor for punishment
-                
-                base_c = self.get_decision(i, r, prev_avg)
-                
-                if governance_type == 'punishment' and self.player_types[i] == 'free_rider':
-                    # Free riders adapt to avoid punishment
-                    # They try to do just enough (e.g. 60-80% of perceived average)
-                    # But sometimes fail.
-                    base_c = max(base_c, int(prev_avg * 0.8) if r > 1 else 5)
-                
-                if governance_type == 'reward' and self.player_types[i] == 'conditional':
-                    # Conditional cooperators contribute more to get reward
-                    base_c += 1
-                    
-                c = max(0, min(self.endowment, base_c))
-                contributions.append(c)
-            
-            total_pool = sum(contributions)
-            current_avg = total_pool / self.n_players
-            prev_avg = current_avg
-            
-            # 2. Payoff Phase
-            for i in range(self.n_players):
-                c = contributions[i]
-                reward = self.calculate_payoff(c, total_pool, governance_type, contributions)
-                
-                # Record Data
-                record = {
-                    'round': r,
-                    'player_id': i + 1, # 1-based ID
-                    'contribution': c,
-                    'total_pool': total_pool,
-                    'reward': reward,
-                    'governance': governance_type # Extra field for analysis
-                }
-                self.history.append(record)
-                
-        return pd.DataFrame(self.history)
+        return self.run_simulations([governance_type])
+
+    def run(self, governance='none'):
+        # Alias matching public_goods_game.PublicGoodsGame.run (returns a DataFrame here)
+        return self.run_simulation(governance)
 
 # Main Execution Flow
-if __name__ == "__main__":
-    game = PublicGoodsGame(rounds=10)
+def main():
+    # Set random seed for reproducibility
+    game = PublicGoodsGame(n_rounds=10, seed=42)
     
-    # 1. Run Scenarios
-    df_none = game.run_simulation('none')
-    df_punish = game.run_simulation('punishment')
-    df_reward = game.run_simulation('reward')
-    
-    # Combine for analysis
-    df_all = pd.concat([df_none, df_punish, df_reward])
+    # 1. Run Scenarios (all three in a single simulation pass, already combined for analysis)
+    df_all = game.run_simulations(['none', 'punishment', 'reward'])
     
     # 2. Save Data (Simulating the requirement to produce consistent data)
-    df_none.to_csv('exp3_no_gov.csv', index=False)
-    df_punish.to_csv('exp3_punish.csv', index=False)
-    df_reward.to_csv('exp3_reward.csv', index=False)
+    df_all[df_all['governance'] == 'none'].to_csv('exp3_no_gov.csv', index=False)
+    df_all[df_all['governance'] == 'punishment'].to_csv('exp3_punish.csv', index=False)
+    df_all[df_all['governance'] == 'reward'].to_csv('exp3_reward.csv', index=False)
     
     print("Simulation Complete. Data files generated: exp3_no_gov.csv, exp3_punish.csv, exp3_reward.csv")
     
@@ -154,9 +190,9 @@ if __name__ == "__main__":
     sns.set_style("whitegrid")
     
     # Calculate average contribution per round per governance
-    avg_trends = df_all.groupby(['governance', 'round'])['contribution'].mean().reset_index()
+    avg_trends = df_all.groupby(['governance', 'round'], observed=True, as_index=False)['contribution'].mean()
     
-    sns.lineplot(data=avg_trends, x='round', y='contribution', hue='governance', marker='o', linewidth=2.5)
+    sns.lineplot(data=avg_trends, x='round', y='contribution', hue='governance', marker='o', errorbar=None, linewidth=2.5)
     
     plt.title('Impact of Governance Mechanisms on Average Contribution', fontsize=16)
     plt.xlabel('Round', fontsize=12)
@@ -169,13 +205,15 @@ if __name__ == "__main__":
     
     # 4. Show sample data to console for verification
     print("\n--- Sample Data (No Governance, Round 1-2) ---")
-    print(df_none.head(10))
+    print(df_all.head(10))
     
     print("\n--- Sample Data (Punishment Logic Check) ---")
     # Show cases where reward is 0 in punishment mode
-    punished_cases = df_punish[df_punish['reward'] == 0]
+    punished_cases = df_all[(df_all['governance'] == 'punishment') & (df_all['reward'] == 0)]
     if not punished_cases.empty:
         print(punished_cases.head())
     else:
         print("No severe punishments (reward=0) occurred in this run.")
 
+if __name__ == "__main__":
+    main()